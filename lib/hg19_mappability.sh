@@ -44,3 +44,6 @@ else
     rm wgEncodeCrgMapabilityAlign100mer.bigWig
     rm wgEncodeCrgMapabilityAlign100mer.wig
 fi
+
+# optional: memory-mapped index used automatically in place of tabix scans (wgEncodeCrgMapabilityAlign100mer.bed.gz.mapidx)
+python `dirname $0`/../scripts/build_map_index.py -b wgEncodeCrgMapabilityAlign100mer.bed.gz
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import os
+import gzip
+import array
+import shutil
+import argparse
+import logging
+
+import numpy as np
+
+
+FORMAT = '%(asctime)s %(message)s'
+logging.basicConfig(format=FORMAT)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def write_chrom(outdir, i, starts, ends, scores):
+    ''' arrays for one chromosome, read back by MapIndex in tebreak/mapindex.py '''
+    starts = np.frombuffer(starts, dtype=np.int64)
+    ends   = np.frombuffer(ends, dtype=np.int64)
+    scores = np.frombuffer(scores, dtype=np.float64)
+
+    lens = ends - starts
+
+    np.save('%s/%d.starts.npy' % (outdir, i), starts)
+    np.save('%s/%d.ends.npy' % (outdir, i), ends)
+    np.save('%s/%d.scores.npy' % (outdir, i), scores)
+    np.save('%s/%d.score_sums.npy' % (outdir, i), np.concatenate(([0.0], np.cumsum(scores * lens))))
+    np.save('%s/%d.len_sums.npy' % (outdir, i), np.concatenate(([0], np.cumsum(lens))))
+
+
+def main(args):
+    outdir = args.out
+    if outdir is None:
+        outdir = args.bed + '.mapidx'
+
+    tmpdir = outdir + '.tmp'
+    if os.path.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+
+    os.mkdir(tmpdir)
+
+    opener = open
+    if args.bed.endswith('.gz'):
+        opener = gzip.open
+
+    chroms = []
+
+    chrom = None
+    starts = ends = scores = None
+
+    with opener(args.bed, 'rt') as bed:
+        for line in bed:
+            if line.startswith('#') or line.startswith('track') or not line.strip():
+                continue
+
+            mchrom, mstart, mend, mscore = line.strip().split()[:4]
+            mstart, mend = int(mstart), int(mend)
+
+            if mchrom != chrom:
+                if chrom is not None:
+                    write_chrom(tmpdir, len(chroms)-1, starts, ends, scores)
+                    logger.info('%s: %d records' % (chrom, len(starts)))
+
+                assert mchrom not in chroms, 'input must be sorted by chromosome: %s seen twice' % mchrom
+
+                chrom = mchrom
+                chroms.append(chrom)
+                starts, ends, scores = array.array('q'), array.array('q'), array.array('d')
+
+            if mstart == 0 or mend <= mstart: # never scored by avgmap
+                continue
+
+            assert len(ends) == 0 or mstart >= ends[-1], 'records must be sorted and non-overlapping: %s' % line.strip()
+
+            starts.append(mstart)
+            ends.append(mend)
+            scores.append(float(mscore))
+
+    if chrom is not None:
+        write_chrom(tmpdir, len(chroms)-1, starts, ends, scores)
+        logger.info('%s: %d records' % (chrom, len(starts)))
+
+    with open(tmpdir + '/index.txt', 'w') as index:
+        for i, chrom in enumerate(chroms):
+            index.write('%s\t%d\n' % (chrom, i))
+
+    if os.path.exists(outdir):
+        shutil.rmtree(outdir)
+
+    os.rename(tmpdir, outdir)
+
+    logger.info('wrote %s' % outdir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='convert mappability BED (e.g. from lib/hg19_mappability.sh) into memory-mapped arrays for fast average mappability lookups')
+    parser.add_argument('-b', '--bed', required=True, help='mappability BED, may be bgzipped (chrom, start, end, score)')
+    parser.add_argument('-o', '--out', default=None, help='output directory (default = <bed>.mapidx, found automatically next to the tabix file)')
+    args = parser.parse_args()
+    main(args)
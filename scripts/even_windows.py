@@ -1,16 +1,44 @@
 #!/usr/bin/env python
 
+import os
+import sys
 import pysam
 import argparse
 import logging
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak import bamindex
+from tebreak.bamindex import bam_index_path, bam_window_weights
+
 
 FORMAT = '%(asctime)s %(message)s'
 logging.basicConfig(format=FORMAT)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def main(args):
+def index_windows(args):
+    ''' windows with similar read counts estimated from the .bai/.csi index, boundaries where a new BGZF block starts '''
+    bam = pysam.AlignmentFile(args.bam, 'rb')
+
+    assert bam_index_path(args.bam) is not None, 'no .bai/.csi index for %s, index it or use --scan' % args.bam
+
+    reads_per_window = bam.mapped / float(args.windows)
+
+    assert reads_per_window > 0, "too few reads or too many windows"
+
+    chrlen = dict(zip(bam.references, bam.lengths))
+    weights = bam_window_weights([args.bam], chrlen)
+
+    chromlist = [chrom for chrom in bam.references if weights[chrom][0].sum() > 0]
+
+    # same windows as tebreak's Genome.index_chunk(), each chromosome starts a new window as in scan_windows()
+    for chrom, start, end, read_count in bamindex.index_windows(weights, chrlen, chromlist, reads_per_window):
+        print('%s\t%d\t%d\t%d' % (chrom, max(0, start-int(args.padding)), end, round(read_count)))
+
+
+def scan_windows(args):
     bam = pysam.AlignmentFile(args.bam, 'rb')
 
     read_count = 0
@@ -47,10 +75,18 @@ def main(args):
     print('%s\t%d\t%d\t%d' % (last_chrom, first_pos, prev_rec.reference_end, read_count))
 
 
+def main(args):
+    if args.scan:
+        scan_windows(args)
+    else:
+        index_windows(args)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='assign windows to BAMs such that reads are evenly distributed among the windows')
     parser.add_argument('-b', '--bam', required=True, help='coordinate-sorted BAM')
     parser.add_argument('-w', '--windows', required=True)
     parser.add_argument('-p', '--padding', default=0)
+    parser.add_argument('--scan', action='store_true', default=False, help='count reads by reading the whole BAM instead of estimating from its .bai/.csi index')
     args = parser.parse_args()
     main(args)
@@ -11,6 +11,11 @@ import numpy as np
 
 from uuid import uuid4
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.mapindex import open_map_track, avgmap
+
 
 FORMAT = '%(asctime)s %(message)s'
 logging.basicConfig(format=FORMAT)
@@ -151,31 +156,6 @@ def levenshtein(s1, s2):
     return previous_row[-1]
 
 
-def avgmap(maptabix, chrom, start, end):
-    ''' return average mappability across chrom:start-end region; maptabix = pysam.Tabixfile'''
-    scores = []
-
-    if None in (start, end): return None
-
-    if chrom in maptabix.contigs:
-        for rec in maptabix.fetch(chrom, int(start), int(end)):
-            mchrom, mstart, mend, mscore = rec.strip().split()
-            mstart, mend = int(mstart), int(mend)
-            mscore = float(mscore)
-
-            while mstart < mend and mstart:
-                mstart += 1
-                if mstart >= int(start) and mstart <= int(end):
-                    scores.append(mscore)
-
-        if len(scores) > 0:
-            return sum(scores) / float(len(scores))
-        else:
-            return 0.0
-    else:
-        return 0.0
-
-
 def main(args):
 
     inslib = None
@@ -193,7 +173,7 @@ def main(args):
     count_3p_switchcons = 0
 
     if args.maptabix:
-        maptabix = pysam.Tabixfile(args.maptabix)
+        maptabix = open_map_track(args.maptabix)
 
     out_fn = '.'.join(args.table.split('.')[:-1]) + '.filter.txt'
     out_tab = open(out_fn, 'w')
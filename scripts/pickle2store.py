@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import pickle
+import argparse
+import logging
+
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStoreWriter, load_insertions
+
+
+FORMAT = '%(asctime)s %(message)s'
+logging.basicConfig(format=FORMAT)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def main(args):
+    assert not os.path.exists(args.out), "file exists: %s, refusing to overwrite." % args.out
+
+    insertions = load_insertions(args.input)
+    logger.info('loaded %d records from %s' % (len(insertions), args.input))
+
+    if args.to_pickle:
+        with open(args.out, 'wb') as pickout:
+            pickle.dump(list(insertions), pickout)
+
+    else:
+        store = RecordStoreWriter(args.out)
+        for ins in insertions:
+            store.write(ins)
+        store.close()
+
+    logger.info('wrote %d records to %s' % (len(insertions), args.out))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='convert a tebreak pickle (list of insertions) into an indexed record store, or back with --to_pickle')
+    parser.add_argument('-i', '--input', required=True, help='tebreak pickle or record store')
+    parser.add_argument('-o', '--out', required=True, help='output filename')
+    parser.add_argument('--to_pickle', action='store_true', default=False, help='write a plain pickle of the record list instead of a record store')
+    args = parser.parse_args()
+    main(args)
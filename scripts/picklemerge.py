@@ -3,13 +3,18 @@
 
 import os
 import sys
-import pickle
 import logging
 
 logger = logging.getLogger(__name__)
 
 from collections import OrderedDict as od
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStoreWriter, load_insertions
+
+
 def resolve_duplicates(insertions):
     ''' resolve instances where breakpoints occur > 1x in the insertion list '''
     ''' this can happen if intervals overlap, e.g. in  genome chunking '''
@@ -61,8 +66,7 @@ if len(sys.argv) > 2:
     insertions = []
 
     for pfn in sys.argv[2:]:
-        with open(pfn, 'rb') as pickin:
-            insertions += pickle.load(pickin)
+        insertions += list(load_insertions(pfn))
 
         logger.info('loaded %s' % pfn)
 
@@ -72,8 +76,10 @@ if len(sys.argv) > 2:
 
     logger.info('%d records remain after merge.' % len(insertions))
 
-    with open(sys.argv[1], 'wb') as pickout:
-        pickle.dump(insertions, pickout)
+    store = RecordStoreWriter(sys.argv[1])
+    for ins in insertions:
+        store.write(ins)
+    store.close()
 
     logger.info('wrote %d records to %s' % (len(insertions), sys.argv[1]))
 
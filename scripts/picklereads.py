@@ -1,16 +1,22 @@
 #!/usr/bin/env python
 
 import os
-import pickle
+import sys
 import argparse
 import logging
 
 from uuid import uuid4
 from collections import defaultdict as dd
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStore, load_insertions, readstore_fastq, readstore_count
+
 
 logger = logging.getLogger(__name__)
 
+
 def output_fastq(ins, pickle, uuid):
     out_sr_fn = '.'.join(pickle.strip().split('.')[:-1]) + '.' + uuid + '.SR.fastq'
     out_dr_fn = '.'.join(pickle.strip().split('.')[:-1]) + '.' + uuid + '.DR.fastq'
@@ -21,7 +27,7 @@ def output_fastq(ins, pickle, uuid):
     out_sr = open(out_sr_fn, 'w')
     out_dr = open(out_dr_fn, 'w')
 
-    for read in ins['READSTORE']:
+    for read in readstore_fastq(ins['READSTORE']):
         if read.find('.SR/') > 0:
             out_sr.write(read)
             sr_count += 1
@@ -39,8 +45,7 @@ def output_fastq(ins, pickle, uuid):
 def main(args):
     logger.debug('loading pickle: %s' % args.pickle)
 
-    with open(args.pickle, 'rb') as pickin:
-        insertions = pickle.load(pickin)
+    insertions = load_insertions(args.pickle)
 
     logger.debug('finished loading %s' % args.pickle)
     logger.debug('raw candidate count: %d' % len(insertions))
@@ -51,9 +56,13 @@ def main(args):
             if not line.startswith('UUID') and not line.startswith ('#'):
                 uuids[line.strip().split()[0]] = True
 
+    if isinstance(insertions, RecordStore): # read only the listed records
+        store = insertions
+        insertions = (store.get(uuid) for uuid in uuids if uuid in store)
+
     for ins in insertions:
         if ins['INFO']['ins_uuid'] in uuids:
-            if len(ins['READSTORE']) == 0:
+            if readstore_count(ins['READSTORE']) == 0:
                 logger.warning('no reads for insertion: %s' % ins['INFO']['ins_uuid'])
                 continue
 
@@ -69,7 +78,7 @@ if __name__ == '__main__':
     logger.setLevel(logging.DEBUG)
 
     parser = argparse.ArgumentParser(description='output reads supporting insertions')
-    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py pickle)')
+    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py record store or pickle)')
     parser.add_argument('-u', '--uuids', required=True, help='list of UUIDS in a .txt file - can use a tebreak table')
     args = parser.parse_args()
     main(args)
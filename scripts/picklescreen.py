@@ -1,9 +1,9 @@
 #!/usr/bin/env python
 
 import os
+import sys
 import re
 import shutil
-import pickle
 import argparse
 import logging
 import subprocess
@@ -11,6 +11,11 @@ import subprocess
 from uuid import uuid4
 from collections import defaultdict as dd
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStoreWriter, load_insertions
+
 
 logger = logging.getLogger(__name__)
 
@@ -102,8 +107,7 @@ def makefq(insertions, tmpdir='/tmp', use_distal=False):
 def main(args):
     logger.debug('loading pickle: %s' % args.pickle)
 
-    with open(args.pickle, 'rb') as pickin:
-        insertions = pickle.load(pickin)
+    insertions = load_insertions(args.pickle) # a record store is streamed twice rather than held in memory
 
     logger.debug('finished loading %s' % args.pickle)
     logger.debug('raw candidate count: %d' % len(insertions))
@@ -114,7 +118,13 @@ def main(args):
 
     mapped = mapfilter(fq, ref, minscore=args.minscore, minmatch=float(args.minmatch), threads=int(args.threads))
 
-    filtered = []
+    out_pickle = '.'.join(args.pickle.split('.')[:-1]) + '.screened.pickle'
+
+    if args.out is not None:
+        out_pickle = args.out
+
+    store = RecordStoreWriter(out_pickle)
+    kept = 0
 
     for ins in insertions:
         keep = True
@@ -127,14 +137,12 @@ def main(args):
             rec = dd(dict)
             rec['INFO'] = ins['INFO']
             rec['READSTORE'] = ins['READSTORE']
-            filtered.append(rec)
-
-    logger.debug('kept %d records' % len(filtered))
+            store.write(rec)
+            kept += 1
 
-    out_pickle = '.'.join(args.pickle.split('.')[:-1]) + '.screened.pickle'
+    store.close()
 
-    with open(out_pickle, 'wn') as pickout:
-        pickle.dump(filtered, pickout)
+    logger.debug('kept %d records' % kept)
 
 
 if __name__ == '__main__':
@@ -143,10 +151,10 @@ if __name__ == '__main__':
     logger.setLevel(logging.DEBUG)
 
     parser = argparse.ArgumentParser(description='filter pickle based on alignments')
-    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py pickle)')
+    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py record store or pickle)')
     parser.add_argument('-r', '--ref', required=True, help='reference to align consensus sequences against')
     parser.add_argument('-t', '--threads', default=4, help='alignment threads')
-    parser.add_argument('-o', '--out', default=None, help='output filename (tebreak.py pickle)')
+    parser.add_argument('-o', '--out', default=None, help='output filename (tebreak.py record store)')
     parser.add_argument('-i', '--invert', default=False, action='store_true', help='retain insertions that do not match library')
     parser.add_argument('-s', '--minscore', default=20, help='minimum alignment score (-T option to bwa mem) default=20')
     parser.add_argument('-m', '--minmatch', default=0.90, help='minimum match pct/100 (default 0.90)')
@@ -1,12 +1,17 @@
 #!/usr/bin/env python
 
 import os
-import pickle
+import sys
 import argparse
 import logging
 
 from collections import OrderedDict as od
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStoreWriter, RecordStore, load_insertions
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,24 +25,27 @@ def main(args):
             uuid = line.strip().split()[0]
             uuids[uuid] = True
 
-    insertions = []
-
-    with open(args.pickle, 'rb') as pickin:
-        insertions = pickle.load(pickin)
+    insertions = load_insertions(args.pickle)
 
     logger.info('finished loading %s' % args.pickle)
     logger.info('raw candidate count: %d' % len(insertions))
 
-    filtered = []
+    if isinstance(insertions, RecordStore): # read only the listed records
+        store = insertions
+        insertions = (store.record(i) for i in sorted([store.uuid_index[uuid] for uuid in uuids if uuid in store]))
+
+    kept = 0
+
+    out = RecordStoreWriter(args.out)
 
     for ins in insertions:
         if ins['INFO']['ins_uuid'] in uuids:
-            filtered.append(ins)
+            out.write(ins)
+            kept += 1
 
-    logger.info('kept %d records' % len(filtered))
+    out.close()
 
-    with open(args.out, 'wb') as pickout:
-        pickle.dump(filtered, pickout)
+    logger.info('kept %d records' % kept)
 
 
 if __name__ == '__main__':
@@ -46,8 +54,8 @@ if __name__ == '__main__':
     logger.setLevel(logging.INFO)
 
     parser = argparse.ArgumentParser(description='filter pickle based on UUIDs')
-    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py pickle)')
+    parser.add_argument('-p', '--pickle', required=True, help='input filename (tebreak.py record store or pickle)')
     parser.add_argument('-u', '--uuids', required=True, help='list of UUIDs to keep (if >1 column, use the first column)')
-    parser.add_argument('-o', '--out', required=True, help='output pickle')
+    parser.add_argument('-o', '--out', required=True, help='output record store')
     args = parser.parse_args()
     main(args)
@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 
+import os
 import sys
-import cPickle as pickle
 import logging
 
-from collections import defaultdict as dd
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.store import RecordStoreWriter, load_insertions
 
 logger = logging.getLogger(__name__)
 FORMAT = '%(asctime)s %(message)s'
@@ -15,22 +18,22 @@ logger.setLevel(logging.DEBUG)
 if len(sys.argv) == 2:
     logger.debug('loading pickle: %s' % sys.argv[1])
 
-    with open(sys.argv[1], 'r') as pickin:
-        insertions = pickle.load(pickin)
+    insertions = load_insertions(sys.argv[1])
 
     logger.debug('raw candidate count: %d' % len(insertions))
 
-    ins_by_chrom = dd(list) 
+    stores = {} # chrom --> RecordStoreWriter, records are streamed through
 
     for ins in insertions:
-        ins_by_chrom[ins['INFO']['chrom']].append(ins)
+        chrom = ins['INFO']['chrom']
+        if chrom not in stores:
+            stores[chrom] = RecordStoreWriter('%s.%s.pickle' % ('.'.join(sys.argv[1].split('.')[:-1]), chrom))
+
+        stores[chrom].write(ins)
 
-    for chrom in ins_by_chrom:
-        outfn = '%s.%s.pickle' % ('.'.join(sys.argv[1].split('.')[:-1]), chrom)
-        with open(outfn, 'w') as out:
-            pickle.dump(ins_by_chrom[chrom], out)
+    for store in stores.values():
+        store.close()
 
 
 else:
     sys.exit('usage: %s <pickle>' % sys.argv[0])
-
@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import os
+import sys
 import pysam
 import random
 import logging
@@ -19,6 +20,11 @@ import multiprocessing as mp
 from collections import defaultdict as dd
 from bx.intervals.intersection import Intersecter, Interval
 
+# the tebreak package is next to scripts/ in a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tebreak.mapindex import open_map_track, avgmap
+
 
 ''' identify clusters of discordant read ends where one end is in BED file '''
 
@@ -274,32 +280,6 @@ class SplitRead:
             return self.read.qual[:self.query_breakpos]
 
 
-def avgmap(maptabix, chrom, start, end):
-    ''' return average mappability across chrom:start-end region; maptabix = pysam.Tabixfile '''
-    scores = []
-
-    if None in (start, end):
-        return None
-
-    if chrom in maptabix.contigs:
-        for rec in maptabix.fetch(chrom, int(start), int(end)):
-            mchrom, mstart, mend, mscore = rec.strip().split()
-            mstart, mend = int(mstart), int(mend)
-            mscore = float(mscore)
-
-            while mstart < mend and mstart:
-                mstart += 1
-                if mstart >= int(start) and mstart <= int(end):
-                    scores.append(mscore)
-
-        if len(scores) > 0:
-            return sum(scores) / float(len(scores))
-        else:
-            return 0.0
-    else:
-        return 0.0
-
-
 def flip(strand):
     if strand == '+':
         return '-'
@@ -486,7 +466,7 @@ def disco_run_chunk(args, chunk):
 
     maptrack = None
     if args.maptrack is not None:
-        maptrack = pysam.Tabixfile(args.maptrack)
+        maptrack = open_map_track(args.maptrack)
 
     nonref = None
     if args.nonref is not None:
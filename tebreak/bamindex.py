@@ -0,0 +1,206 @@
+''' read counts estimated from .bai/.csi BAM indexes, used by tebreak and scripts/even_windows.py to chunk the genome '''
+
+import os
+import re
+import gzip
+import struct
+import pysam
+
+import numpy as np
+
+
+INDEX_WINDOW = 16384 # .bai linear index resolution
+
+
+def bam_index_path(bamfn):
+    ''' .bai or .csi index next to bamfn, None if there isn't one '''
+    for fn in (bamfn + '.bai', re.sub('.bam$', '.bai', bamfn), bamfn + '.csi'):
+        if os.path.exists(fn):
+            return fn
+
+    return None
+
+
+def read_bam_index(idxfn):
+    ''' parse .bai/.csi --> list per reference of (window starts (bp), virtual offsets of first alignment, end offset, mapped count) '''
+    ''' .bai: 16kbp linear index; .csi: loffset of leaf bins. mapped/end offset come from the pseudo-bin and are None if absent '''
+
+    if idxfn.endswith('.csi'):
+        with gzip.open(idxfn, 'rb') as idx: # BGZF
+            data = idx.read()
+    else:
+        with open(idxfn, 'rb') as idx:
+            data = idx.read()
+
+    magic = data[:4]
+    assert magic in (b'BAI\x01', b'CSI\x01'), 'not a BAM index: %s' % idxfn
+
+    csi = magic == b'CSI\x01'
+    pos = 4
+
+    min_shift, depth = 14, 5
+
+    if csi:
+        min_shift, depth, l_aux = struct.unpack_from('<iii', data, pos)
+        pos += 12 + l_aux
+
+    leaf_offset = ((1 << 3*depth) - 1) // 7
+    pseudo_bin  = ((1 << (3*depth + 3)) - 1) // 7 + 1
+
+    n_ref, = struct.unpack_from('<i', data, pos)
+    pos += 4
+
+    refs = []
+
+    for _ in range(n_ref):
+        n_bin, = struct.unpack_from('<i', data, pos)
+        pos += 4
+
+        leaves = []
+        mapped = end_offset = None
+
+        for _ in range(n_bin):
+            if csi:
+                bin_id, loffset, n_chunk = struct.unpack_from('<IQi', data, pos)
+                pos += 16
+            else:
+                bin_id, n_chunk = struct.unpack_from('<Ii', data, pos)
+                pos += 8
+
+            chunks = struct.unpack_from('<%dQ' % (2*n_chunk), data, pos)
+            pos += 16*n_chunk
+
+            if bin_id == pseudo_bin:
+                end_offset, mapped = chunks[1], chunks[2]
+
+            elif csi and bin_id >= leaf_offset:
+                leaves.append(((bin_id - leaf_offset) << min_shift, loffset))
+
+        if csi:
+            leaves.sort()
+            starts  = np.array([l[0] for l in leaves], dtype=np.int64)
+            offsets = np.array([l[1] for l in leaves], dtype=np.uint64)
+
+        else:
+            n_intv, = struct.unpack_from('<i', data, pos)
+            pos += 4
+
+            offsets = np.frombuffer(data, dtype='<u8', count=n_intv, offset=pos).astype(np.uint64)
+            pos += 8*n_intv
+
+            starts = np.arange(n_intv, dtype=np.int64) << min_shift
+
+            keep = offsets > 0 # older indexes leave empty windows at 0
+            starts, offsets = starts[keep], offsets[keep]
+
+        if len(offsets) > 0:
+            offsets = np.maximum.accumulate(offsets)
+
+        refs.append((starts, offsets, end_offset, mapped))
+
+    return refs
+
+
+def index_window_weights(bamfn, chrlen, window=INDEX_WINDOW):
+    ''' estimated reads per window from the BAM index, no data is read '''
+    ''' returns dict chrom --> (weights, newblock) where newblock marks windows whose first alignment opens a new BGZF block '''
+
+    idxfn = bam_index_path(bamfn)
+    if idxfn is None:
+        raise IOError('no .bai/.csi index found for %s' % bamfn)
+
+    bam = pysam.AlignmentFile(bamfn)
+    references = bam.references
+    bam.close()
+
+    weights = {}
+
+    for chrom, (starts, offsets, end_offset, mapped) in zip(references, read_bam_index(idxfn)):
+        if chrom not in chrlen:
+            continue
+
+        n = (chrlen[chrom] + window - 1) // window
+
+        w  = np.zeros(n, dtype=np.float64)
+        nb = np.zeros(n, dtype=bool)
+
+        if len(offsets) > 0:
+            coffsets = (offsets >> np.uint64(16)).astype(np.int64) # compressed file offset of each window's BGZF block
+
+            end = coffsets[-1]
+            if end_offset is not None:
+                end = max(end, end_offset >> 16)
+
+            nbytes = np.diff(np.append(coffsets, end)).astype(np.float64)
+
+            if mapped is not None and nbytes.sum() > 0:
+                nbytes *= float(mapped) / nbytes.sum()
+
+            bins = np.minimum(starts // window, n-1)
+            np.add.at(w, bins, nbytes)
+
+            newblock = np.ones(len(coffsets), dtype=bool)
+            newblock[1:] = coffsets[1:] != coffsets[:-1]
+            nb[bins[newblock]] = True
+
+        weights[chrom] = (w, nb)
+
+    return weights
+
+
+def bam_window_weights(bamlist, chrlen, window=INDEX_WINDOW):
+    ''' index_window_weights() summed over BAMs: dict chrom --> (weights, newblock) for every chrom in chrlen '''
+    weights = dict([(chrom, (np.zeros((length + window - 1) // window), np.zeros((length + window - 1) // window, dtype=bool))) for chrom, length in chrlen.items()])
+
+    for bamfn in bamlist:
+        for chrom, (w, nb) in index_window_weights(bamfn, chrlen, window=window).items():
+            weights[chrom][0][:] += w
+            weights[chrom][1][:] |= nb
+
+    return weights
+
+
+def index_windows(weights, chrlen, chromlist, chunkreads, window=INDEX_WINDOW):
+    ''' cut each chromosome in chromlist into windows of ~chunkreads estimated reads, yields (chrom, start, end, reads) '''
+    ''' boundaries fall on index windows whose first alignment opens a new BGZF block, so neighbouring windows share at most that block '''
+    ''' each chromosome starts with a full read budget: windows never span chromosomes, so a remainder is not carried over '''
+    for chrom in chromlist:
+        w, nb = weights[chrom]
+
+        readsleft = chunkreads # track how many reads still go into the current window
+        reads = 0.0
+
+        start = 0
+
+        for i in range(len(w)):
+            readsleft -= w[i]
+            reads     += w[i]
+
+            if readsleft <= 0 and i+1 < len(w) and nb[i+1]:
+                end = (i+1)*window
+                yield chrom, start, end, reads
+
+                start = end
+                readsleft = chunkreads
+                reads = 0.0
+
+        yield chrom, start, chrlen[chrom], reads
+
+
+def window_reads(weights, chrom, start, end, window=INDEX_WINDOW):
+    ''' estimated reads in chrom:start-end, partly covered index windows count in proportion to the overlap '''
+    w = weights[chrom][0]
+
+    start = max(0, int(start))
+    end   = min(len(w)*window, int(end))
+
+    if end <= start:
+        return 0.0
+
+    first, last = start // window, (end - 1) // window
+
+    reads = w[first:last+1].sum()
+    reads -= w[first] * float(start - first*window) / window
+    reads -= w[last]  * float((last+1)*window - end) / window
+
+    return float(reads)
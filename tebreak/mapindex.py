@@ -0,0 +1,97 @@
+''' average mappability lookups from a tabix-indexed mappability track or an index written by scripts/build_map_index.py '''
+
+import os
+import pysam
+
+import numpy as np
+
+
+class MapIndex:
+    ''' mappability track converted by scripts/build_map_index.py, read-only memory-mapped arrays per chromosome:
+        record starts, ends, scores and prefix sums of score*length and length, two lookups per avgmap() '''
+    def __init__(self, path):
+        self.path = path
+        self.chroms = {}
+        self.arrays = {}
+
+        with open(path + '/index.txt', 'r') as index:
+            for line in index:
+                chrom, i = line.strip().split('\t')
+                self.chroms[chrom] = int(i)
+
+        self.contigs = list(self.chroms.keys())
+
+    def chrom_arrays(self, chrom):
+        if chrom not in self.arrays:
+            i = self.chroms[chrom]
+            self.arrays[chrom] = [np.load('%s/%d.%s.npy' % (self.path, i, name), mmap_mode='r') for name in ('starts', 'ends', 'scores', 'score_sums', 'len_sums')]
+
+        return self.arrays[chrom]
+
+    def avgmap(self, chrom, start, end):
+        ''' same value as the tabix scan: a record (mstart, mend, score) scores positions mstart+1 .. mend,
+            positions in [start, end] are averaged, tabix does not return records ending at start '''
+        if chrom not in self.chroms:
+            return 0.0
+
+        start, end = int(start), int(end)
+
+        if end <= start: # empty tabix region
+            return 0.0
+
+        starts, ends, scores, score_sums, len_sums = self.chrom_arrays(chrom)
+
+        lo = int(np.searchsorted(ends, start, side='right')) # first record with mend > start
+        hi = int(np.searchsorted(starts, end, side='left'))  # records with mstart < end reach positions <= end
+
+        if hi <= lo:
+            return 0.0
+
+        lclip = max(0, start - int(starts[lo]) - 1)
+        rclip = max(0, int(ends[hi-1]) - end)
+
+        count = int(len_sums[hi] - len_sums[lo]) - lclip - rclip
+
+        if count <= 0:
+            return 0.0
+
+        total = float(score_sums[hi] - score_sums[lo]) - lclip*float(scores[lo]) - rclip*float(scores[hi-1])
+
+        return total / count
+
+
+def open_map_track(fn):
+    ''' MapIndex if fn is, or has next to it (fn.mapidx), an index from scripts/build_map_index.py, pysam.Tabixfile otherwise '''
+    for path in (fn, fn + '.mapidx'):
+        if os.path.exists(path + '/index.txt'):
+            return MapIndex(path)
+
+    return pysam.Tabixfile(fn)
+
+
+def avgmap(maptabix, chrom, start, end):
+    ''' return average mappability across chrom:start-end region; maptabix = pysam.Tabixfile or MapIndex'''
+    scores = []
+
+    if None in (start, end): return None
+
+    if isinstance(maptabix, MapIndex):
+        return maptabix.avgmap(chrom, start, end)
+
+    if chrom in maptabix.contigs:
+        for rec in maptabix.fetch(chrom, int(start), int(end)):
+            mchrom, mstart, mend, mscore = rec.strip().split()
+            mstart, mend = int(mstart), int(mend)
+            mscore = float(mscore)
+
+            while mstart < mend and mstart:
+                mstart += 1
+                if mstart >= int(start) and mstart <= int(end):
+                    scores.append(mscore)
+
+        if len(scores) > 0:
+            return sum(scores) / float(len(scores))
+        else:
+            return 0.0
+    else:
+        return 0.0
@@ -0,0 +1,394 @@
+''' tebreak's intermediate record format: insertion INFO records, packed support reads (READSTORE) and the indexed record store '''
+''' shared by tebreak and the scripts/pickle*.py tools '''
+
+import bisect
+import struct
+import pickle
+import zlib
+
+import numpy as np
+
+from collections import OrderedDict as od
+from collections import defaultdict as dd
+
+
+INFO_FIELDS = (
+    'ins_uuid', 'chrom', 'min_supporting_base', 'max_supporting_base', 'mappability',
+    'be1_breakpos', 'be1_obj_uuid', 'be1_cons_seq', 'be1_prox_seq', 'be1_dist_seq', 'be1_umap_seq', 'be1_prox_str', 'be1_prox_loc',
+    'be1_sr_count', 'be1_num_maps', 'be1_cons_scr', 'be1_median_D', 'be1_avgmatch', 'be1_rg_count', 'be1_bf_count', 'be1_prox_mpq',
+    'be1_improved', 'be1_dist_chr', 'be1_dist_pos', 'be1_dist_end', 'be1_dist_mpq',
+    'be2_breakpos', 'be2_obj_uuid', 'be2_cons_seq', 'be2_prox_seq', 'be2_dist_seq', 'be2_umap_seq', 'be2_prox_str', 'be2_prox_loc',
+    'be2_sr_count', 'be2_num_maps', 'be2_cons_scr', 'be2_median_D', 'be2_avgmatch', 'be2_rg_count', 'be2_bf_count', 'be2_prox_mpq',
+    'be2_improved', 'be2_dist_chr', 'be2_dist_pos', 'be2_dist_end', 'be2_dist_mpq',
+    'be1_use_prox', 'be2_use_prox', 'be1_end_over', 'be2_end_over', 'dr_count', 'dr_unmapped_mates', 'genotypes'
+) # in Insertion.compile_info() order
+
+INT_LIST_FIELDS = frozenset(['%s_%s' % (be, f) for be in ('be1', 'be2') for f in ('prox_mpq', 'dist_pos', 'dist_end', 'dist_mpq')]) # comma-joined ints
+
+
+class InsRecord:
+    ''' insertion INFO with fixed slots for the Insertion.compile_info() fields, other keys go in an ordered extra dict '''
+    ''' dict-compatible: comma-joined integer fields are kept as int tuples and joined again on access '''
+    __slots__ = INFO_FIELDS + ('_extra',)
+
+    def __init__(self, items=()):
+        self._extra = None
+        for key, value in items:
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, info):
+        if isinstance(info, cls):
+            return info
+        return cls(info.items())
+
+    def __getitem__(self, key):
+        if key in INT_LIST_FIELDS:
+            try:
+                return ','.join(map(str, getattr(self, key)))
+            except AttributeError:
+                raise KeyError(key)
+
+        if key in INFO_SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+
+        if self._extra is None:
+            raise KeyError(key)
+
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in INT_LIST_FIELDS and isinstance(value, str):
+            value = tuple([int(v) for v in value.split(',') if v])
+
+        if key in INFO_SLOTS:
+            setattr(self, key, value)
+            return
+
+        if self._extra is None:
+            self._extra = od()
+
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in INFO_SLOTS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+
+        elif self._extra is None:
+            raise KeyError(key)
+
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        if key in INFO_SLOTS:
+            return hasattr(self, key)
+
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [key for key in INFO_FIELDS if hasattr(self, key)]
+        if self._extra is not None:
+            keys += list(self._extra.keys())
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def __eq__(self, other):
+        return hasattr(other, 'items') and list(self.items()) == list(other.items())
+
+    def __getstate__(self):
+        ''' (slot values in INFO_FIELDS order with Ellipsis for unset, extra items): no per-record key strings '''
+        extra = None
+        if self._extra is not None:
+            extra = list(self._extra.items())
+
+        return (tuple([getattr(self, key, Ellipsis) for key in INFO_FIELDS]), extra)
+
+    def __setstate__(self, state):
+        values, extra = state
+
+        for key, value in zip(INFO_FIELDS, values):
+            if value is not Ellipsis:
+                setattr(self, key, value)
+
+        self._extra = None
+        if extra is not None:
+            self._extra = od(extra)
+
+
+INFO_SLOTS = frozenset(INFO_FIELDS)
+
+
+READ_TYPES = ('SR', 'DR')
+
+BASE_CODE = np.zeros(256, dtype=np.uint8) # A,C,G,T --> 0-3, anything else is stored as N
+for i, b in enumerate('ACGT'): BASE_CODE[ord(b)] = BASE_CODE[ord(b.lower())] = i
+
+ILLUMINA_QUAL_BINS = np.array([0, 1, 6, 6, 6, 6, 6, 6, 6, 6] + [15]*10 + [22]*5 + [27]*5 + [33]*5 + [37]*5 + [40]*(256-40), dtype=np.uint8)
+
+
+def pack_reads(fastqrecs, bin_quals=False):
+    ''' pack support reads (name.SR/1, seq, qual) for READSTORE: plain dict of bytes so any script can unpickle it '''
+    ''' 2-bit sequence with non-ACGT positions kept as N, zlib-compressed names and phred qualities (optionally Illumina 8-level binned), type/mate as uint8 flags '''
+    names, flags, seqs, quals = [], [], [], []
+
+    for name, seq, qual in fastqrecs:
+        name, suffix = name.rsplit('.', 1)
+        rtype, mate = suffix.split('/')
+
+        names.append(name)
+        flags.append(READ_TYPES.index(rtype) << 2 | int(mate))
+        seqs.append(seq)
+
+        if qual is None or len(qual) != len(seq): # no base qualities (pysam read.qual is None), stored as phred 0
+            qual = '!'*len(seq)
+
+        quals.append(qual)
+
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.uint32)
+
+    bases = np.frombuffer(''.join(seqs).encode(), dtype=np.uint8)
+    codes = BASE_CODE[bases]
+
+    acgt = np.isin(bases, np.frombuffer(b'ACGTacgt', dtype=np.uint8))
+    npos = np.flatnonzero(~acgt).astype(np.uint32)
+
+    codes = np.append(codes, np.zeros((-len(codes)) % 4, dtype=np.uint8)).reshape(-1, 4)
+    packed = codes[:,0] << 6 | codes[:,1] << 4 | codes[:,2] << 2 | codes[:,3]
+
+    phred = np.frombuffer(''.join(quals).encode(), dtype=np.uint8) - 33
+    if bin_quals:
+        phred = ILLUMINA_QUAL_BINS[phred]
+
+    return {
+        'count':   len(names),
+        'names':   zlib.compress('\n'.join(names).encode()),
+        'flags':   bytes(bytearray(flags)),
+        'lengths': lengths.tobytes(),
+        'seq':     packed.astype(np.uint8).tobytes(),
+        'npos':    npos.tobytes(),
+        'qual':    zlib.compress(phred.astype(np.uint8).tobytes())
+    }
+
+
+def readstore_count(readstore):
+    ''' number of reads in READSTORE, packed or a list of FASTQ strings from an older intermediate '''
+    if isinstance(readstore, dict):
+        return readstore['count']
+
+    return len(readstore)
+
+
+def unpack_reads(readstore):
+    ''' yield (name, read type, mate, seq, qual) from a READSTORE made by pack_reads() '''
+    if readstore['count'] == 0:
+        return
+
+    names   = zlib.decompress(readstore['names']).decode().split('\n')
+    lengths = np.frombuffer(readstore['lengths'], dtype=np.uint32)
+    packed  = np.frombuffer(readstore['seq'], dtype=np.uint8)
+    npos    = np.frombuffer(readstore['npos'], dtype=np.uint32)
+    quals   = np.frombuffer(zlib.decompress(readstore['qual']), dtype=np.uint8) + 33
+
+    offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+
+    for i, name in enumerate(names):
+        start, end = int(offsets[i]), int(offsets[i+1])
+
+        codes = (packed[start//4:(end+3)//4, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3
+        seq = np.frombuffer(b'ACGT', dtype=np.uint8)[codes.reshape(-1)[start%4:start%4+end-start]]
+
+        n = npos[bisect.bisect_left(npos, start):bisect.bisect_left(npos, end)] - start
+        if len(n) > 0:
+            seq = seq.copy()
+            seq[n] = ord('N')
+
+        flag = readstore['flags'][i]
+
+        yield name, READ_TYPES[flag >> 2], flag & 3, seq.tobytes().decode(), quals[start:end].tobytes().decode()
+
+
+def readstore_fastq(readstore):
+    ''' yield READSTORE reads as FASTQ records named name.SR/1 etc., packed or from an older intermediate '''
+    if not isinstance(readstore, dict):
+        for rec in readstore:
+            yield rec
+        return
+
+    for name, rtype, mate, seq, qual in unpack_reads(readstore):
+        yield '@%s.%s/%d\n%s\n+\n%s\n' % (name, rtype, mate, seq, qual)
+
+
+STORE_MAGIC = b'TEBREAK_STORE\x01'
+
+
+class RecordStoreWriter:
+    ''' write insertion records one at a time, the uuid and (chrom, position) index follows on close() '''
+    ''' layout: magic, (8 byte length, pickled record) per record, pickled index, 8 byte index offset, magic '''
+    def __init__(self, fn):
+        self.fn = fn
+        self.out = open(fn, 'wb')
+        self.out.write(STORE_MAGIC)
+
+        self.index = {'uuid': [], 'chrom': [], 'pos': [], 'offset': [], 'info_fields': INFO_FIELDS, 'int_list_fields': sorted(INT_LIST_FIELDS)}
+
+    def write(self, rec):
+        if isinstance(rec['INFO'], InsRecord): # plain tuple, no class in the file; decode() maps values by index['info_fields']
+            plain = dd(dict)
+            plain.update(rec)
+            plain['INFO'] = ('InsRecord',) + rec['INFO'].__getstate__()
+            data = pickle.dumps(plain, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            data = pickle.dumps(rec, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.index['uuid'].append(rec['INFO']['ins_uuid'])
+        self.index['chrom'].append(rec['INFO']['chrom'])
+        self.index['pos'].append(min(int(rec['INFO']['be1_breakpos']), int(rec['INFO']['be2_breakpos'])))
+        self.index['offset'].append(self.out.tell())
+
+        self.out.write(struct.pack('<Q', len(data)))
+        self.out.write(data)
+
+    def close(self):
+        index_offset = self.out.tell()
+        pickle.dump(self.index, self.out, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.out.write(struct.pack('<Q', index_offset))
+        self.out.write(STORE_MAGIC)
+        self.out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordStore:
+    ''' read records written by RecordStoreWriter: stream in file order, or fetch by uuid or region without reading the rest '''
+    def __init__(self, fn):
+        self.fn = fn
+        self.f = open(fn, 'rb')
+
+        assert self.f.read(len(STORE_MAGIC)) == STORE_MAGIC, 'not a tebreak record store: %s' % fn
+
+        self.f.seek(-(8+len(STORE_MAGIC)), 2)
+        tail = self.f.read()
+        assert tail[8:] == STORE_MAGIC, 'record store has no index (incomplete write?): %s' % fn
+
+        self.index_offset, = struct.unpack('<Q', tail[:8])
+
+        self.f.seek(self.index_offset)
+        index = pickle.load(self.f)
+
+        self.uuids   = index['uuid']
+        self.offsets = index['offset']
+        self.info_fields = tuple(index.get('info_fields', ()))
+
+        self.uuid_index = dict([(uuid, i) for i, uuid in enumerate(self.uuids)])
+
+        self.region_index = dd(list) # chrom --> sorted (pos, record number)
+        for i, (chrom, pos) in enumerate(zip(index['chrom'], index['pos'])):
+            self.region_index[chrom].append((pos, i))
+
+        for chrom in self.region_index:
+            self.region_index[chrom].sort()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, uuid):
+        return uuid in self.uuid_index
+
+    def __iter__(self):
+        with open(self.fn, 'rb') as f:
+            f.seek(len(STORE_MAGIC))
+            while f.tell() < self.index_offset:
+                size, = struct.unpack('<Q', f.read(8))
+                yield self.decode(pickle.loads(f.read(size)))
+
+    def record(self, i):
+        self.f.seek(self.offsets[i])
+        size, = struct.unpack('<Q', self.f.read(8))
+        return self.decode(pickle.loads(self.f.read(size)))
+
+    def decode(self, rec):
+        ''' INFO is stored as (tag, field values with Ellipsis for unset, extra items), see InsRecord.__getstate__ '''
+        if isinstance(rec['INFO'], tuple):
+            tag, values, extra = rec['INFO']
+            info = InsRecord()
+
+            if self.info_fields == INFO_FIELDS:
+                info.__setstate__((values, extra))
+
+            else: # written with a different field list
+                info.update(od([(field, value) for field, value in zip(self.info_fields, values) if value is not Ellipsis] + (extra or [])))
+
+            rec['INFO'] = info
+
+        return rec
+
+    def get(self, uuid):
+        return self.record(self.uuid_index[uuid])
+
+    def fetch(self, chrom, start=None, end=None):
+        ''' records on chrom with start <= min(be1_breakpos, be2_breakpos) < end, in position order '''
+        recs = self.region_index.get(chrom, [])
+
+        lo, hi = 0, len(recs)
+        if start is not None: lo = bisect.bisect_left(recs, (int(start), -1))
+        if end is not None: hi = bisect.bisect_left(recs, (int(end), -1))
+
+        for pos, i in recs[lo:hi]:
+            yield self.record(i)
+
+    def close(self):
+        self.f.close()
+
+
+def is_record_store(fn):
+    with open(fn, 'rb') as f:
+        return f.read(len(STORE_MAGIC)) == STORE_MAGIC
+
+
+def load_insertions(fn):
+    ''' RecordStore, or the list from a pickle written before the record store (see scripts/pickle2store.py) '''
+    if is_record_store(fn):
+        return RecordStore(fn)
+
+    with open(fn, 'rb') as pickin:
+        return pickle.load(pickin)
+
+
+def write_record_store(fn, insertions):
+    with RecordStoreWriter(fn) as store:
+        for ins in insertions:
+            if ins is not None:
+                store.write(ins)
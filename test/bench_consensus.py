@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+''' benchmark SplitCluster.consensus against the original scikit-bio TabularMSA scoring, run from test/ '''
+
+import re
+import sys
+import time
+import importlib.machinery
+import importlib.util
+
+import pysam
+import numpy as np
+
+import skbio.alignment as skalign
+import skbio.sequence as skseq
+
+
+def load_tebreak(fn='../tebreak/tebreak'):
+    loader = importlib.machinery.SourceFileLoader('tebreak_script', fn)
+    spec   = importlib.util.spec_from_loader('tebreak_script', loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def msa_consensus(tb, cluster, minscore=0.9, seed=1):
+    ''' consensus as built before the SSW profile engine: TabularMSA conservation scoring '''
+    np.random.seed(seed)
+
+    minqual = cluster.reads[0].minqual
+
+    sortable_reads = [tb.SortableRead(sr.read) for sr in cluster.reads]
+    seqs = [tb.qualtrim(sorted_read.read, minqual=minqual) for sorted_read in sorted(sortable_reads)]
+    seqs = [s for s in seqs if len(s) > 20]
+
+    if len(seqs) == 0: return '', 0.0
+    if len(seqs) == 1: return seqs[0], 1.0
+
+    uniq_seqs = [seqs[0]]
+    for i, seq in enumerate(seqs[1:], start=1):
+        if seq != seqs[i-1]:
+            uniq_seqs.append(seq)
+
+    if len(uniq_seqs) == 1: return uniq_seqs[0], 1.0
+
+    cons = uniq_seqs[0]
+    scores = []
+
+    if len(uniq_seqs) > 1000:
+        uniq_seqs = [uniq_seqs[u] for u in sorted(np.random.choice(range(len(uniq_seqs)), size=1000))]
+
+    for seq in uniq_seqs[1:]:
+        cons = cons.replace('N','A')
+        seq = seq.replace('N','A')
+
+        aln_res = skalign.local_pairwise_align_ssw(skseq.DNA(cons), skseq.DNA(seq))
+        if aln_res is None: return cons, 0.0
+
+        aln_tab = aln_res[0]
+        s1_aln, s2_aln = aln_res[2]
+
+        a1 = cons[s1_aln[0]:s1_aln[1]+1]
+
+        score = 0.0
+        if aln_tab.shape.position > 10:
+            score = sum(aln_tab.conservation(gap_mode='include')==1.)/aln_tab.shape.position
+
+        if re.search(a1, cons):
+            if score >= minscore and s1_aln[1]+1 > len(cons)-5:
+                scores.append(score)
+                cons += seq[s2_aln[1]+1:]
+
+    if scores: return cons, np.mean(scores)
+    return cons, 0.0
+
+
+if __name__ == '__main__':
+    tb = load_tebreak()
+
+    bam = pysam.AlignmentFile('data/example.ins.bam')
+    chrom = bam.references[0]
+
+    filters = {'min_minclip': 3, 'max_N_consensus': 4, 'min_MW_P': 0.01, 'genome_mask': None}
+
+    splitreads = tb.fetch_clipped_reads([bam], chrom, 0, bam.lengths[0], filters)
+    splitreads.sort()
+
+    subclusters = []
+    for cluster in tb.build_sr_clusters(splitreads):
+        for breakpos in cluster.all_breakpoints():
+            for direction in ('left', 'right'):
+                subcluster = cluster.subcluster_by_breakend([breakpos], direction=direction)
+                if len(subcluster) > 1: subclusters.append(subcluster)
+
+    start = time.time()
+    new = [c.consensus() for c in subclusters]
+    new_time = time.time() - start
+
+    start = time.time()
+    old = [msa_consensus(tb, c) for c in subclusters]
+    old_time = time.time() - start
+
+    mismatch = [i for i, (n, o) in enumerate(zip(new, old)) if n[0] != o[0] or abs(n[1] - o[1]) > 1e-9]
+
+    print('breakend consensus count: %d' % len(subclusters))
+    print('TabularMSA consensus: %0.2f sec' % old_time)
+    print('SSW profile consensus: %0.2f sec' % new_time)
+    print('mismatched consensus: %d' % len(mismatch))
+
+    sys.exit(len(mismatch) > 0)
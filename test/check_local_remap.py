@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+''' regression checks for LocalRemapper.proximal alignments, run from test/ '''
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import importlib.machinery
+import importlib.util
+
+from types import SimpleNamespace
+
+import pysam
+
+
+def load_tebreak(fn='../tebreak/tebreak'):
+    loader = importlib.machinery.SourceFileLoader('tebreak_script', fn)
+    spec   = importlib.util.spec_from_loader('tebreak_script', loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def mutate(base):
+    return {'A': 'C', 'C': 'G', 'G': 'T', 'T': 'A'}[base]
+
+
+class LocalRemapTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tb = load_tebreak()
+        cls.tmpdir = tempfile.mkdtemp()
+
+        random.seed(1)
+        cls.refseq = ''.join([random.choice('ACGT') for _ in range(3000)])
+
+        cls.fasta = os.path.join(cls.tmpdir, 'ref.fa')
+        with open(cls.fasta, 'w') as fa:
+            fa.write('>chrT\n%s\n' % cls.refseq)
+
+        pysam.faidx(cls.fasta)
+
+        cls.remapper = cls.tb.LocalRemapper(cls.fasta)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def breakend(self, cons, breakpos):
+        reads = [SimpleNamespace(read=SimpleNamespace(mapq=60))]
+        return SimpleNamespace(chrom='chrT', consensus=cons, breakpos=breakpos, uuid='be', cluster=SimpleNamespace(reads=reads))
+
+    def test_left_extension_nm(self):
+        ''' mismatch at consensus base 0: local alignment clips it, clipping penalty extends it back '''
+        cons = mutate(self.refseq[1500]) + self.refseq[1501:1600]
+
+        read, remainder = self.remapper.proximal(self.breakend(cons, 1550))
+
+        self.assertEqual(read.cigarstring, '100M')
+        self.assertEqual(read.reference_start, 1500)
+        self.assertEqual(read.get_tag('NM'), 1)
+
+    def test_right_extension_nm(self):
+        cons = self.refseq[1500:1599] + mutate(self.refseq[1599])
+
+        read, remainder = self.remapper.proximal(self.breakend(cons, 1550))
+
+        self.assertEqual(read.cigarstring, '100M')
+        self.assertEqual(read.reference_start, 1500)
+        self.assertEqual(read.get_tag('NM'), 1)
+
+    def test_exact_nm(self):
+        cons = self.refseq[1500:1600]
+
+        read, remainder = self.remapper.proximal(self.breakend(cons, 1550))
+
+        self.assertEqual(read.cigarstring, '100M')
+        self.assertEqual(read.get_tag('NM'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()